@@ -1,6 +1,271 @@
 """
 Implementation of ema radial filters, as first part of Eq. 13 in [1].
 
+The filter designs are cached. Cached helpers take arrays as bytes to make
+them hashable and return read-only arrays.
+
 [1] Ahrens, J. (2022). Ambisonic Encoding of Signals From Equatorial Microphone
     Arrays (No. arXiv:2211.00584). arXiv. http://arxiv.org/abs/2211.00584
 """
+import functools
+
+import numpy as np
+import scipy as sc
+import pyfar as pf
+
+from src.utils import (
+    _derivative_sph_hankel, _fill_nans_from_next, _sh_equator_table,
+    _tikhonov_regularization, _limiting)
+
+
+@functools.lru_cache(maxsize=32)
+def _sh_coefficient_matrix(N):
+    """
+    Squared spherical harmonics on the equator for the radial filters.
+
+    Parameters
+    ----------
+    N : int
+        Maximum order.
+
+    Returns
+    -------
+    Y : numpy.ndarray
+        Matrix of shape (2N+1, N+1) with Y[m+N, n'] = Y_n'^m(pi/2, 0)**2 for
+        |m| <= n' and zero otherwise.
+    """
+    Y = _sh_equator_table(N)**2
+    Y.flags.writeable = False
+
+    return Y
+
+
+@functools.lru_cache(maxsize=32)
+def _compute_bn(f_bytes, R, N, hankel_type, c):
+    """
+    Radial coefficients b_n of the orders 0 to N.
+
+    Parameters
+    ----------
+    f_bytes : bytes
+        Frequencies in Hz as returned by ``numpy.ndarray.tobytes`` of a float
+        array.
+    R : float
+        Radius of the array in m.
+    N : int
+        Maximum order.
+    hankel_type : int
+        Kind of the hankel function, 1 or 2.
+    c : float
+        Speed of sound in m/s.
+
+    Returns
+    -------
+    b_n : numpy.ndarray
+        Radial coefficients of shape (N+1, n_bins).
+    """
+    f = np.frombuffer(f_bytes, dtype=float)
+    k = 2 * np.pi * f / c
+    kR = k * R + 5 * np.finfo(float).eps
+    inv_kR2 = np.reciprocal(kR * kR)
+
+    hankel_derivative = _derivative_sph_hankel(N, hankel_type, kR)
+    # -4 pi i^n i with i^n taken from its period of four
+    i_n = np.array([1, 1j, -1, -1j])[np.arange(N + 1) % 4]
+    coef = -4 * np.pi * 1j * i_n
+    b_n = np.reciprocal(hankel_derivative, out=hankel_derivative)
+    b_n *= coef[:, None] * inv_kR2
+    _fill_nans_from_next(b_n)
+    b_n.flags.writeable = False
+
+    return b_n
+
+
+def _design_inverse_rf_freq(f_bytes, R, N, limit_dB, regularization_type,
+                            hankel_type, c, dtype):
+    """
+    Frequency responses of the inverse radial filters.
+
+    Parameters
+    ----------
+    f_bytes : bytes
+        Frequencies in Hz from 0 to half the sampling rate as returned by
+        ``numpy.ndarray.tobytes`` of a float array.
+    R : float
+        Radius of the array in m.
+    N : int
+        Ambisonics order.
+    limit_dB : float, None
+        Maximum gain of the inverse radial filters in dB. ``None`` inverts the
+        radial filters without regularization.
+    regularization_type : str
+        ``'soft'`` or ``'hard'`` limiting, or ``'tikhonov'`` regularization.
+    hankel_type : int
+        Kind of the hankel function, 1 or 2.
+    c : float
+        Speed of sound in m/s.
+    dtype : numpy.dtype
+        Complex data type of the filter design.
+
+    Returns
+    -------
+    inverse_radial_filter : numpy.ndarray
+        Inverse radial filters for m = -N, ..., N of shape (2N+1, n_bins).
+    sampling_rate : float
+        Sampling rate in Hz, twice the last frequency.
+    """
+    if regularization_type not in ('soft', 'hard', 'tikhonov'):
+        raise ValueError(
+            "regularization_type must be 'soft', 'hard' or 'tikhonov'.")
+    if dtype not in (np.complex64, np.complex128):
+        raise ValueError("dtype must be numpy.complex64 or numpy.complex128.")
+    if dtype == np.complex64 and limit_dB is None:
+        raise ValueError(
+            "numpy.complex64 requires limit_dB, the unregularized inverse "
+            "exceeds the single precision range.")
+
+    f = np.frombuffer(f_bytes, dtype=float)
+    sampling_rate = 2 * f[-1]
+
+    b_n = _compute_bn(f_bytes, R, N, hankel_type, c)
+    radial_filters = _sh_coefficient_matrix(N) @ b_n
+    if dtype == np.complex64:
+        # raise magnitudes that underflow in single precision to the smallest
+        # normal number to keep their inverse finite
+        tiny = np.finfo(np.float32).tiny
+        mag = np.abs(radial_filters)
+        small = (mag > 0) & (mag < tiny)
+        radial_filters[small] *= tiny / mag[small]
+        radial_filters = radial_filters.astype(dtype)
+
+    if limit_dB is not None and regularization_type == 'tikhonov':
+        inverse_radial_filter = _tikhonov_regularization(
+            radial_filters, limit_dB)
+    else:
+        inverse_radial_filter = 1 / radial_filters
+        _fill_nans_from_next(inverse_radial_filter)
+        if limit_dB is not None:
+            inverse_radial_filter = _limiting(
+                inverse_radial_filter, limit_dB, regularization_type)
+
+    return inverse_radial_filter, sampling_rate
+
+
+@functools.lru_cache(maxsize=32)
+def _design_inverse_rf(f_bytes, R, N, limit_dB, regularization_type,
+                       hankel_type, c, dtype):
+    """
+    Impulse responses of the inverse radial filters.
+
+    Takes the same parameters as ``_design_inverse_rf_freq``. The impulse
+    responses are circularly shifted by half their length to be causal.
+
+    Returns
+    -------
+    inverse_radial_filter_t : numpy.ndarray
+        Inverse radial filters for m = -N, ..., N of shape
+        (2N+1, 2*(n_bins-1)).
+    sampling_rate : float
+        Sampling rate in Hz, twice the last frequency.
+    """
+    inverse_radial_filter, sampling_rate = _design_inverse_rf_freq(
+        f_bytes, R, N, limit_dB, regularization_type, hankel_type, c, dtype)
+
+    inverse_radial_filter_t = sc.fft.irfft(
+        inverse_radial_filter, axis=-1, workers=-1)
+    # the irfft length 2*(n_bins-1) is even, the shift is an integer
+    n_samples = inverse_radial_filter_t.shape[-1]
+    inverse_radial_filter_t = np.roll(
+        inverse_radial_filter_t, n_samples // 2, axis=-1)
+    inverse_radial_filter_t.flags.writeable = False
+
+    return inverse_radial_filter_t, sampling_rate
+
+
+def radial_filters_ema(f, R, N, limit_dB=40, regularization_type='soft',
+                       hankel_type=2, c=343, dtype=np.complex128):
+    """
+    Regularized inverse ema radial filters.
+
+    Parameters
+    ----------
+    f : array like
+        Frequencies in Hz from 0 to half the sampling rate of shape (n_bins, ).
+    R : float
+        Radius of the array in m.
+    N : int
+        Ambisonics order.
+    limit_dB : float, optional
+        Maximum gain of the inverse radial filters in dB. The default is 40.
+    regularization_type : str, optional
+        ``'soft'`` or ``'hard'`` limiting, or ``'tikhonov'`` regularization.
+        The default is ``'soft'``.
+    hankel_type : int, optional
+        Kind of the hankel function, 1 or 2. The default is 2.
+    c : float, optional
+        Speed of sound in m/s. The default is 343.
+    dtype : numpy.dtype, optional
+        Complex data type of the filter design, ``numpy.complex128`` or
+        ``numpy.complex64``. Single precision halves the memory traffic of
+        the inversion, limiting and IRFFT. Its error stays far below the
+        regularization, which bounds the filter gain to limit_dB. Requires
+        limit_dB to be given. The default is ``numpy.complex128``.
+
+    Returns
+    -------
+    radial_filters : pyfar.FilterFIR
+        Inverse radial filters for m = -N, ..., N with 2*(n_bins-1)
+        coefficients each.
+    """
+    if limit_dB is None:
+        raise ValueError("limit_dB must be given for regularized filters.")
+
+    inverse_radial_filter_t, sampling_rate = _design_inverse_rf(
+        np.asarray(f, dtype=float).tobytes(), R, N, limit_dB,
+        regularization_type, hankel_type, c, np.dtype(dtype))
+
+    return pf.FilterFIR(inverse_radial_filter_t.copy(), sampling_rate)
+
+
+def inverse_radial_filters_ema(f, R, N, limit_dB=None,
+                               regularization_type='soft', hankel_type=2,
+                               c=343, dtype=np.complex128):
+    """
+    Inverse ema radial filters as time signals.
+
+    Parameters
+    ----------
+    f : array like
+        Frequencies in Hz from 0 to half the sampling rate of shape (n_bins, ).
+    R : float
+        Radius of the array in m.
+    N : int
+        Ambisonics order.
+    limit_dB : float, None, optional
+        Maximum gain of the inverse radial filters in dB. ``None`` inverts the
+        radial filters without regularization. The default is ``None``.
+    regularization_type : str, optional
+        ``'soft'`` or ``'hard'`` limiting, or ``'tikhonov'`` regularization.
+        The default is ``'soft'``.
+    hankel_type : int, optional
+        Kind of the hankel function, 1 or 2. The default is 2.
+    c : float, optional
+        Speed of sound in m/s. The default is 343.
+    dtype : numpy.dtype, optional
+        Complex data type of the filter design, ``numpy.complex128`` or
+        ``numpy.complex64``. Single precision halves the memory traffic of
+        the inversion, limiting and IRFFT. Its error stays far below the
+        regularization, which bounds the filter gain to limit_dB. Requires
+        limit_dB to be given. The default is ``numpy.complex128``.
+
+    Returns
+    -------
+    inverse_radial_filters : pyfar.Signal
+        Inverse radial filters for m = -N, ..., N of shape (2N+1, ) and
+        2*(n_bins-1) samples.
+    """
+    inverse_radial_filter_t, sampling_rate = _design_inverse_rf(
+        np.asarray(f, dtype=float).tobytes(), R, N, limit_dB,
+        regularization_type, hankel_type, c, np.dtype(dtype))
+
+    return pf.Signal(inverse_radial_filter_t.copy(), sampling_rate)
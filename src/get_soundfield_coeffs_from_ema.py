@@ -1,7 +1,120 @@
 """
 Get sh soundfield coefficients from EMA data as in Eq. 13 in [1].
-Requires ema radial filters.
+Requires ema radial filters. Cached helpers take arrays as bytes to make them
+hashable and return read-only arrays.
 
 [1] Ahrens, J. (2022). Ambisonic Encoding of Signals From Equatorial Microphone
     Arrays (No. arXiv:2211.00584). arXiv. http://arxiv.org/abs/2211.00584
-"""
\ No newline at end of file
+"""
+import functools
+
+import numpy as np
+import scipy as sc
+import pyfar as pf
+
+from src.utils import _sh_equator_table
+
+
+@functools.lru_cache(maxsize=32)
+def _circular_harmonics_matrix(N, alpha_bytes):
+    """
+    Real circular harmonics of the orders -N to N at the microphone angles.
+
+    Parameters
+    ----------
+    N : int
+        Maximum order.
+    alpha_bytes : bytes
+        Azimuth angles of the microphones in radians as returned by
+        ``numpy.ndarray.tobytes`` of a float array.
+
+    Returns
+    -------
+    W : numpy.ndarray
+        Matrix of shape (2N+1, n_mics) with the rows sqrt(2) sin(|m| alpha)
+        for m < 0, 1 for m = 0, and sqrt(2) cos(m alpha) for m > 0.
+    """
+    alpha = np.frombuffer(alpha_bytes, dtype=float)
+    m = np.arange(1, N + 1)[:, None]
+
+    W = np.vstack((
+        np.sqrt(2) * np.sin(m * alpha)[::-1],
+        np.ones((1, alpha.size)),
+        np.sqrt(2) * np.cos(m * alpha)))
+    W.flags.writeable = False
+
+    return W
+
+
+@functools.lru_cache(maxsize=32)
+def _ambisonics_weights(N):
+    """
+    Weights and circular harmonic indices of the ambisonics channels.
+
+    Parameters
+    ----------
+    N : int
+        Maximum order.
+
+    Returns
+    -------
+    w : numpy.ndarray
+        Weights (-1)**m Y_n^|m|(pi/2, 0) in ACN order of shape ((N+1)**2, ).
+    src : numpy.ndarray
+        Index m+N of the circular harmonic that feeds each ambisonics
+        channel of shape ((N+1)**2, ).
+    """
+    n = np.concatenate([np.full(2 * nn + 1, nn) for nn in range(N + 1)])
+    m = np.concatenate([np.arange(-nn, nn + 1) for nn in range(N + 1)])
+
+    w = (-1.0)**m * _sh_equator_table(N)[m + N, n]
+    src = m + N
+    w.flags.writeable = False
+    src.flags.writeable = False
+
+    return w, src
+
+
+def get_sh_soundfield_coeffs_ema(signals, radial_filters, N, alpha):
+    """
+    Ambisonics signals from the signals of an equatorial microphone array.
+
+    Parameters
+    ----------
+    signals : pyfar.Signal
+        Microphone signals of shape (n_mics, ).
+    radial_filters : pyfar.Signal
+        Inverse radial filters for m = -N, ..., N of shape (2N+1, ) as
+        returned by ``inverse_radial_filters_ema``.
+    N : int
+        Ambisonics order.
+    alpha : array like
+        Azimuth angles of the microphones in radians of shape (n_mics, ).
+
+    Returns
+    -------
+    s_ambisonics : pyfar.Signal
+        Ambisonics signals in ACN channel order of shape ((N+1)**2, ) with
+        the same number of samples as the microphone signals.
+    """
+    alpha = np.asarray(alpha, dtype=float)
+    time = signals.time
+    n_samples = signals.n_samples
+    n_mics = signals.cshape[0]
+
+    # circular harmonics decomposition of the microphone signals
+    W = _circular_harmonics_matrix(N, alpha.tobytes())
+    s_surf_m = W @ time / n_mics
+
+    # apply the radial filters as one batched fft convolution
+    n_fft = sc.fft.next_fast_len(
+        n_samples + radial_filters.n_samples - 1, real=True)
+    S = sc.fft.rfft(s_surf_m, n=n_fft, axis=-1, workers=-1)
+    B = sc.fft.rfft(radial_filters.time, n=n_fft, axis=-1, workers=-1)
+    s_sh = sc.fft.irfft(S * B, n=n_fft, axis=-1, workers=-1)[..., :n_samples]
+
+    # ambisonics signals in acn order
+    w, src = _ambisonics_weights(N)
+    s_ambisonics = w[:, None] * s_sh[src]
+
+    return pf.Signal(s_ambisonics, signals.sampling_rate)
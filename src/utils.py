@@ -4,4 +4,195 @@ Implementations of utility functions like:
 - derivative of spherical hankel functions
 - regularization
 - limiting
+- spherical harmonics on the equator
 """
+import numpy as np
+from scipy import special
+
+try:
+    from scipy.special import sph_harm_y
+except ImportError:
+    # scipy < 1.15 only provides sph_harm with swapped arguments
+    def sph_harm_y(n, m, theta, phi):
+        return special.sph_harm(m, n, phi, theta)
+
+
+def _spherical_hankel_function(nu, hankel_type, z):
+    """
+    Spherical hankel function of first or second kind for several orders.
+
+    Parameters
+    ----------
+    nu : array like
+        Orders of the hankel function of shape (n_orders, ).
+    hankel_type : int
+        Kind of the hankel function, 1 or 2.
+    z : array like
+        Argument of the hankel function of shape (n_z, ).
+
+    Returns
+    -------
+    hankel : numpy.ndarray
+        Spherical hankel functions of shape (n_orders, n_z).
+    """
+    if hankel_type not in (1, 2):
+        raise ValueError("hankel_type must be 1 or 2.")
+    sign = 1 if hankel_type == 1 else -1
+
+    nu = np.atleast_1d(nu)[:, None]
+    z = np.atleast_1d(z)[None, :]
+
+    return (special.spherical_jn(nu, z)
+            + 1j * sign * special.spherical_yn(nu, z))
+
+
+def _derivative_sph_hankel(N, hankel_type, z):
+    """
+    Derivative of the spherical hankel function for the orders 0 to N.
+
+    The hankel functions are evaluated once for the orders 0 to N+1 and the
+    derivatives follow from the recurrence
+    h_n' = (n h_{n-1} - (n+1) h_{n+1}) / (2n+1) and h_0' = -h_1.
+
+    Parameters
+    ----------
+    N : int
+        Maximum order.
+    hankel_type : int
+        Kind of the hankel function, 1 or 2.
+    z : array like
+        Argument of the hankel function of shape (n_z, ).
+
+    Returns
+    -------
+    hankel_derivative : numpy.ndarray
+        Derivatives of shape (N+1, n_z).
+    """
+    nu = np.arange(N + 2)
+    H = _spherical_hankel_function(nu, hankel_type, z)
+
+    hankel_derivative = np.empty((N + 1, H.shape[-1]), dtype=complex)
+    hankel_derivative[0] = -H[1]
+    n = nu[1:-1, None]
+    hankel_derivative[1:] = (n * H[:-2] - (n + 1) * H[2:]) / (2 * n + 1)
+
+    return hankel_derivative
+
+
+def _sh_equator_table(N):
+    """
+    Spherical harmonics on the equator in a single call.
+
+    Parameters
+    ----------
+    N : int
+        Maximum order.
+
+    Returns
+    -------
+    Y : numpy.ndarray
+        Table of shape (2N+1, N+1) with Y[m+N, n] = Y_n^|m|(pi/2, 0) for
+        |m| <= n and zero otherwise. The values are real on the equator at
+        azimuth zero.
+    """
+    n, m = np.meshgrid(np.arange(N + 1), np.arange(-N, N + 1))
+    mask = np.abs(m) <= n
+
+    Y = np.zeros(n.shape)
+    Y[mask] = sph_harm_y(n[mask], np.abs(m[mask]), np.pi / 2, 0).real
+
+    return Y
+
+
+def _fill_nans_from_next(data):
+    """
+    Replace nans by the magnitude of the next frequency bin.
+
+    Parameters
+    ----------
+    data : numpy.ndarray
+        Complex data of shape (n_channels, n_bins). The data is modified in
+        place. Nans in the last bin stay nan.
+
+    Returns
+    -------
+    data : numpy.ndarray
+        Data without nans.
+    """
+    nan_rows, nan_cols = np.where(np.isnan(data))
+    src = np.minimum(nan_cols + 1, data.shape[-1] - 1)
+    data[nan_rows, nan_cols] = np.abs(data[nan_rows, src])
+
+    return data
+
+
+def _tikhonov_regularization(data, limit_dB):
+    """
+    Tikhonov regularized inversion of the data.
+
+    The regularization parameter is chosen such that the gain of the inverse
+    does not exceed limit_dB.
+
+    Parameters
+    ----------
+    data : numpy.ndarray
+        Complex data that is inverted.
+    limit_dB : float
+        Maximum gain of the inverse in dB.
+
+    Returns
+    -------
+    data_inverse : numpy.ndarray
+        Regularized inverse of the data.
+    """
+    limit = 10**(limit_dB / 20)
+    lam = 1 / (2 * limit)
+
+    denominator = np.abs(data)
+    np.square(denominator, out=denominator)
+    denominator += lam**2
+    data_inverse = np.conj(data)
+    data_inverse /= denominator
+
+    return data_inverse
+
+
+def _limiting(data, limit_dB, limiting_type='soft'):
+    """
+    Soft or hard limiting of the magnitude of the data.
+
+    Parameters
+    ----------
+    data : numpy.ndarray
+        Complex data that is limited. The data is modified in place.
+    limit_dB : float
+        Maximum magnitude in dB.
+    limiting_type : str, optional
+        ``'soft'`` for arctangent soft clipping or ``'hard'`` for clipping
+        the magnitude at the limit. The default is ``'soft'``.
+
+    Returns
+    -------
+    data : numpy.ndarray
+        Limited data.
+    """
+    limit = 10**(limit_dB / 20)
+
+    mag = np.abs(data)
+
+    if limiting_type == 'soft':
+        # gain 2*limit/pi * arctan(pi/(2*limit) * |x|) / |x|, which is 1 at 0
+        scale = np.arctan(np.pi / (2 * limit) * mag)
+        scale *= 2 * limit / np.pi
+        np.divide(scale, mag, out=scale, where=mag > 0)
+        scale[mag == 0] = 1
+    elif limiting_type == 'hard':
+        scale = np.ones_like(mag)
+        np.divide(limit, mag, out=scale, where=mag > limit)
+    else:
+        raise ValueError("limiting_type must be 'soft' or 'hard'.")
+
+    np.multiply(data, scale, out=data)
+
+    return data
+
@@ -0,0 +1,8 @@
+"""
+Places the repository root on the path so the tests can import src.
+"""
+import os
+import sys
+
+sys.path.insert(
+    0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -2,3 +2,191 @@
 Test for steps in encoding using unittest and matlab results as reference.
 Data for comparison is stored in "resources" folder.
 """
+import unittest
+
+import numpy as np
+from scipy import special
+import scipy.signal as spsignal
+import pyfar as pf
+
+from src.ema_radial_filters import (
+    radial_filters_ema, inverse_radial_filters_ema)
+from src.get_soundfield_coeffs_from_ema import get_sh_soundfield_coeffs_ema
+from src import utils
+
+
+def _reference_inverse_radial_filters(f, R, N, limit_dB, regularization_type,
+                                      hankel_type=2, c=343):
+    """Loop implementation of the inverse radial filter design."""
+    sign = 1 if hankel_type == 1 else -1
+    kR = 2 * np.pi * f / c * R + 5 * np.finfo(float).eps
+
+    b_n = np.zeros((N + 1, f.size), dtype=complex)
+    for n in range(N + 1):
+        hankel_derivative = special.spherical_jn(n, kR, derivative=True) \
+            + 1j * sign * special.spherical_yn(n, kR, derivative=True)
+        b_n[n] = -4 * np.pi * 1j**n * (1j / kR**2) / hankel_derivative
+
+    radial_filters = np.zeros((2 * N + 1, f.size), dtype=complex)
+    for m in range(-N, N + 1):
+        for n_prime in range(abs(m), N + 1):
+            Y = special.sph_harm_y(n_prime, abs(m), np.pi / 2, 0).real
+            radial_filters[m + N] += Y**2 * b_n[n_prime]
+
+    limit = None if limit_dB is None else 10**(limit_dB / 20)
+    if limit is not None and regularization_type == 'tikhonov':
+        lam = 1 / (2 * limit)
+        inverse = np.conj(radial_filters) \
+            / (np.abs(radial_filters)**2 + lam**2)
+    else:
+        inverse = 1 / radial_filters
+        if regularization_type == 'soft' and limit is not None:
+            inverse = 2 * limit / np.pi * inverse / np.abs(inverse) \
+                * np.arctan(np.pi / (2 * limit) * np.abs(inverse))
+        elif regularization_type == 'hard' and limit is not None:
+            idx = np.abs(inverse) > limit
+            inverse[idx] = inverse[idx] / np.abs(inverse[idx]) * limit
+
+    inverse_t = np.fft.irfft(inverse)
+    return np.roll(inverse_t, inverse_t.shape[-1] // 2, axis=-1)
+
+
+def _reference_sh_soundfield_coeffs(signals, radial_filters, N, alpha):
+    """Loop implementation of the ema encoding."""
+    n_mics = signals.shape[0]
+    n_samples = signals.shape[-1]
+
+    s_surf_m = np.zeros((2 * N + 1, n_samples))
+    for m in range(-N, N + 1):
+        if m < 0:
+            weights = np.sqrt(2) * np.sin(abs(m) * alpha)
+        elif m == 0:
+            weights = np.ones(n_mics)
+        else:
+            weights = np.sqrt(2) * np.cos(m * alpha)
+        s_surf_m[m + N] = np.sum(weights[:, None] * signals, axis=0) / n_mics
+
+    s_sh = np.zeros((2 * N + 1, n_samples))
+    for i in range(2 * N + 1):
+        s_sh[i] = spsignal.oaconvolve(
+            s_surf_m[i], radial_filters[i], mode='full')[:n_samples]
+
+    s_ambisonics = np.zeros(((N + 1)**2, n_samples))
+    for n in range(N + 1):
+        for m in range(-n, n + 1):
+            Y = special.sph_harm_y(n, abs(m), np.pi / 2, 0).real
+            s_ambisonics[n**2 + n + m] = (-1)**m * Y * s_sh[m + N]
+
+    return s_ambisonics
+
+
+class TestRadialFilters(unittest.TestCase):
+
+    f = np.fft.rfftfreq(512, 1 / 48000)
+    R = 0.0875
+    N = 5
+
+    def test_radial_filters_ema(self):
+        for regularization_type in ('soft', 'hard', 'tikhonov'):
+            with self.subTest(regularization_type=regularization_type):
+                radial_filters = radial_filters_ema(
+                    self.f, self.R, self.N, 40, regularization_type)
+                reference = _reference_inverse_radial_filters(
+                    self.f, self.R, self.N, 40, regularization_type)
+
+                self.assertEqual(radial_filters.sampling_rate, 48000)
+                np.testing.assert_allclose(
+                    radial_filters.coefficients, reference,
+                    rtol=0, atol=1e-12 * np.max(np.abs(reference)))
+
+    def test_inverse_radial_filters_ema(self):
+        for limit_dB, regularization_type in (
+                (30, 'soft'), (30, 'hard'), (30, 'tikhonov'), (None, 'soft')):
+            with self.subTest(limit_dB=limit_dB,
+                              regularization_type=regularization_type):
+                inverse_radial_filters = inverse_radial_filters_ema(
+                    self.f, self.R, self.N, limit_dB, regularization_type)
+                reference = _reference_inverse_radial_filters(
+                    self.f, self.R, self.N, limit_dB, regularization_type)
+
+                self.assertEqual(
+                    inverse_radial_filters.cshape, (2 * self.N + 1, ))
+                np.testing.assert_allclose(
+                    inverse_radial_filters.time, reference,
+                    rtol=0, atol=1e-12 * np.max(np.abs(reference)))
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            radial_filters_ema(self.f, self.R, self.N, 40, 'linear')
+        with self.assertRaises(ValueError):
+            radial_filters_ema(self.f, self.R, self.N, 40, hankel_type=3)
+        with self.assertRaises(ValueError):
+            radial_filters_ema(self.f, self.R, self.N, 40, dtype=np.float64)
+        with self.assertRaises(ValueError):
+            radial_filters_ema(self.f, self.R, self.N, None)
+        with self.assertRaises(ValueError):
+            inverse_radial_filters_ema(self.f, self.R, self.N, 40, 'linear')
+        with self.assertRaises(ValueError):
+            inverse_radial_filters_ema(
+                self.f, self.R, self.N, None, dtype=np.complex64)
+
+    def test_single_precision(self):
+        for regularization_type in ('soft', 'hard', 'tikhonov'):
+            with self.subTest(regularization_type=regularization_type):
+                radial_filters = radial_filters_ema(
+                    self.f, self.R, self.N, 40, regularization_type,
+                    dtype=np.complex64)
+                reference = radial_filters_ema(
+                    self.f, self.R, self.N, 40, regularization_type)
+
+                np.testing.assert_allclose(
+                    radial_filters.coefficients, reference.coefficients,
+                    rtol=0,
+                    atol=1e-6 * np.max(np.abs(reference.coefficients)))
+
+
+class TestSoundfieldCoeffs(unittest.TestCase):
+
+    def test_get_sh_soundfield_coeffs_ema(self):
+        N = 4
+        n_mics = 2 * N + 2
+        alpha = np.arange(n_mics) * 2 * np.pi / n_mics
+        rng = np.random.default_rng(0)
+        signals = pf.Signal(rng.standard_normal((n_mics, 1000)), 48000)
+        radial_filters = inverse_radial_filters_ema(
+            np.fft.rfftfreq(256, 1 / 48000), 0.0875, N, 40, 'soft')
+
+        s_ambisonics = get_sh_soundfield_coeffs_ema(
+            signals, radial_filters, N, alpha)
+        reference = _reference_sh_soundfield_coeffs(
+            signals.time, radial_filters.time, N, alpha)
+
+        self.assertEqual(s_ambisonics.cshape, ((N + 1)**2, ))
+        self.assertEqual(s_ambisonics.n_samples, signals.n_samples)
+        self.assertEqual(s_ambisonics.sampling_rate, 48000)
+        np.testing.assert_allclose(
+            s_ambisonics.time, reference,
+            rtol=0, atol=1e-12 * np.max(np.abs(reference)))
+
+
+class TestUtils(unittest.TestCase):
+
+    def test_spherical_hankel_function(self):
+        nu = np.arange(31)
+        z = np.logspace(-15, np.log10(200), 2000)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            jn = special.spherical_jn(nu[:, None], z)
+            yn = special.spherical_yn(nu[:, None], z)
+        finite = np.isfinite(yn)
+
+        with np.errstate(invalid='ignore'):
+            hankel = utils._spherical_hankel_function(nu, 1, z)
+
+        np.testing.assert_array_equal(np.isinf(hankel.imag), np.isinf(yn))
+        np.testing.assert_allclose(
+            hankel.real[finite], jn[finite], rtol=1e-10, atol=1e-14)
+        np.testing.assert_allclose(
+            hankel.imag[finite], yn[finite], rtol=1e-10, atol=1e-14)
+
+if __name__ == '__main__':
+    unittest.main()